@@ -1,20 +1,36 @@
+import json
 import os
+import threading
 # Gevent monkey patch (mejora compat. IO/asíncrono)
 try:
     from gevent import monkey  # type: ignore
     monkey.patch_all()
+    from gevent import get_hub  # type: ignore
 except Exception:
-    pass
+    get_hub = None
 
+# orjson (C) codifica 3-5x más rápido que el json estándar; opcional
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None
+
+import time
 from datetime import datetime
+from functools import lru_cache
 from flask import Flask, render_template, jsonify
+from flask.json.provider import JSONProvider
 from flask_socketio import SocketIO, emit
 
+from contextlib import nullcontext
+
 from sqlalchemy import (
-    create_engine, MetaData, Table, Column, String, Integer, ForeignKey, select, func
+    create_engine, MetaData, Table, Column, String, Integer, ForeignKey, select, func, event,
+    text, bindparam
 )
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.engine import Engine
-from sqlalchemy.exc import OperationalError, ProgrammingError
 
 # ----------------- DB CONFIG -----------------
 def normalize_db_url(raw: str) -> str:
@@ -34,87 +50,350 @@ if DATABASE_URL:
 else:
     DATABASE_URL = DEFAULT_SQLITE_URL  # solo dev local
 
-engine: Engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+if IS_SQLITE:
+    _SQLITE_CONNECT_ARGS = {"timeout": 5.0, "check_same_thread": False}
+    # Escritor único (pool de 1) + pool de lectores: WAL permite que las
+    # lecturas corran en paralelo al escritor sin tocarse.
+    engine: Engine = create_engine(
+        DATABASE_URL, connect_args=_SQLITE_CONNECT_ARGS,
+        pool_size=1, max_overflow=0, pool_pre_ping=True, future=True
+    )
+    read_engine: Engine = create_engine(
+        DATABASE_URL, connect_args=_SQLITE_CONNECT_ARGS,
+        pool_size=8, max_overflow=0, pool_pre_ping=True, future=True
+    )
+
+    def _sqlite_pragmas(dbapi_conn) -> None:
+        # WAL: lectores concurrentes con un único escritor, sin "database is locked"
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA busy_timeout=5000")
+        cur.execute("PRAGMA foreign_keys=ON")
+        cur.close()
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_on_connect(dbapi_conn, _record):
+        # Sin BEGIN implícito de pysqlite: abrimos cada transacción nosotros
+        dbapi_conn.isolation_level = None
+        _sqlite_pragmas(dbapi_conn)
+
+    @event.listens_for(engine, "begin")
+    def _sqlite_begin_immediate(conn):
+        # Toma el lock de escritura de entrada, sin upgrade a mitad de transacción
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    @event.listens_for(read_engine, "connect")
+    def _sqlite_on_connect_read(dbapi_conn, _record):
+        _sqlite_pragmas(dbapi_conn)
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA query_only=1")
+        cur.close()
+else:
+    # psycopg3: con prepare_threshold=0 cada statement repetido queda
+    # preparado en el servidor desde la primera ejecución, así los
+    # upserts/updates calientes no se re-planifican por edición.
+    engine = create_engine(
+        DATABASE_URL, connect_args={"prepare_threshold": 0},
+        pool_pre_ping=True, future=True
+    )
+    read_engine = engine  # Postgres maneja lectores/escritores en un solo pool
+
+# SQLite solo admite un escritor: serializar escrituras evita que los handlers
+# concurrentes se peleen por el lock y agoten el pool. En Postgres no hace falta.
+WRITE_LOCK = threading.Lock() if IS_SQLITE else nullcontext()
+
+IS_POSTGRES = engine.dialect.name == "postgresql"
+
+def run_blocking(fn, *args):
+    # El DB driver bloquea el único hilo del hub gevent aunque libere el GIL;
+    # el threadpool del hub (hilos OS reales) mantiene vivos los sockets.
+    if get_hub is None:
+        return fn(*args)
+    return get_hub().threadpool.apply(fn, args)
+
 metadata = MetaData()
 
-agents = Table("agents", metadata, Column("name", String, primary_key=True))
+# WITHOUT ROWID: la fila vive en el B-tree de la PK de texto, un nivel
+# menos de indirección por lookup (solo afecta a bases SQLite nuevas)
+agents = Table(
+    "agents", metadata,
+    Column("name", String, primary_key=True),
+    sqlite_with_rowid=False,
+)
 
 status = Table(
     "status", metadata,
-    Column("agent_name", String, ForeignKey("agents.name"), primary_key=True),
+    Column("agent_name", String,
+           ForeignKey("agents.name", onupdate="CASCADE", ondelete="CASCADE"),
+           primary_key=True),
     Column("backlog", Integer, nullable=False, default=0, server_default="0"),
     Column("active", Integer, nullable=False, default=0, server_default="0"),
     Column("priority", String, nullable=True),
+    sqlite_with_rowid=False,
 )
 
 assignment = Table(
     "assignment", metadata,
-    Column("agent_name", String, ForeignKey("agents.name"), primary_key=True),
+    Column("agent_name", String,
+           ForeignKey("agents.name", onupdate="CASCADE", ondelete="CASCADE"),
+           primary_key=True),
     Column("easy_to_handle", Integer, nullable=False, default=0, server_default="0"),
     Column("investigation", Integer, nullable=False, default=0, server_default="0"),
     Column("autoclose_tickets", Integer, nullable=False, default=0, server_default="0"),
+    sqlite_with_rowid=False,
 )
 
 DEFAULT_AGENTS = ["Victor", "Julio", "Felipe", "Cindy"]
 
+DEFAULT_STATUS_ROW = {"backlog": 0, "active": 0, "priority": None}
+DEFAULT_ASSIGN_ROW = {"easy_to_handle": 0, "investigation": 0, "autoclose_tickets": 0}
+
+# Upsert según dialecto (ON CONFLICT existe en Postgres y SQLite >= 3.24)
+upsert = sqlite_insert if engine.dialect.name == "sqlite" else pg_insert
+
+# ----------------- STATEMENTS PRECOMPILADOS -----------------
+# Los statements calientes se construyen una sola vez al importar; en cada
+# evento solo se bindean parámetros, sin rearmar el árbol de expresiones.
+STATE_SELECT = (
+    select(
+        agents.c.name,
+        status.c.backlog, status.c.active,
+        func.coalesce(status.c.priority, "").label("priority"),
+        assignment.c.easy_to_handle,
+        assignment.c.investigation,
+        assignment.c.autoclose_tickets,
+    )
+    .join(status, status.c.agent_name == agents.c.name)
+    .join(assignment, assignment.c.agent_name == agents.c.name)
+    .order_by(agents.c.name)
+)
+
+AGENT_SEED_STMT = (
+    upsert(agents).values(name=bindparam("agent"))
+    .on_conflict_do_nothing(index_elements=["name"])
+)
+
+def _seed_stmt(table_obj, defaults):
+    row = dict(defaults, agent_name=bindparam("agent"))
+    return upsert(table_obj).values(**row).on_conflict_do_nothing(index_elements=["agent_name"])
+
+def _upsert_stmt(table_obj, defaults, field):
+    row = dict(defaults, agent_name=bindparam("agent"))
+    row[field] = bindparam("v")
+    return (
+        upsert(table_obj).values(**row)
+        .on_conflict_do_update(index_elements=["agent_name"], set_={field: bindparam("v")})
+    )
+
+SEED_STMTS = {
+    "status": _seed_stmt(status, DEFAULT_STATUS_ROW),
+    "assignment": _seed_stmt(assignment, DEFAULT_ASSIGN_ROW),
+}
+
+UPSERT_STMTS = {
+    **{("status", f): _upsert_stmt(status, DEFAULT_STATUS_ROW, f)
+       for f in ("backlog", "active", "priority")},
+    **{("assignment", f): _upsert_stmt(assignment, DEFAULT_ASSIGN_ROW, f)
+       for f in ("easy_to_handle", "investigation", "autoclose_tickets")},
+}
+
+# Vista materializada en Postgres: fetch_state lee el join ya resuelto
+STATE_MV_SELECT = text(
+    "SELECT name, backlog, active, priority, easy_to_handle, investigation, autoclose_tickets "
+    "FROM full_state_mv ORDER BY name"
+)
+
+def _ensure_fk_cascade() -> None:
+    # Migración puntual: bases creadas antes del ON UPDATE/DELETE CASCADE.
+    if IS_SQLITE:
+        with engine.begin() as conn:
+            fk = conn.exec_driver_sql("PRAGMA foreign_key_list(status)").fetchall()
+            if not any(row[5] != "CASCADE" for row in fk):  # col 5 = on_update
+                return
+            # SQLite no puede alterar FKs: recrear las tablas hijas (son diminutas)
+            st_rows = [dict(r) for r in conn.execute(status.select()).mappings()]
+            asg_rows = [dict(r) for r in conn.execute(assignment.select()).mappings()]
+            assignment.drop(conn)
+            status.drop(conn)
+            metadata.create_all(conn)
+            if st_rows:
+                conn.execute(status.insert(), st_rows)
+            if asg_rows:
+                conn.execute(assignment.insert(), asg_rows)
+    elif IS_POSTGRES:
+        with engine.begin() as conn:
+            for tbl in ("status", "assignment"):
+                row = conn.execute(text(
+                    "SELECT conname, confupdtype FROM pg_constraint "
+                    "WHERE conrelid = cast(:t AS regclass) AND contype = 'f'"
+                ), {"t": tbl}).first()
+                if row is not None and row.confupdtype != "c":
+                    conn.execute(text(f'ALTER TABLE {tbl} DROP CONSTRAINT "{row.conname}"'))
+                    conn.execute(text(
+                        f"ALTER TABLE {tbl} ADD CONSTRAINT {tbl}_agent_name_fkey "
+                        "FOREIGN KEY (agent_name) REFERENCES agents(name) "
+                        "ON UPDATE CASCADE ON DELETE CASCADE"
+                    ))
+
 def init_db() -> None:
     metadata.create_all(engine)
+    _ensure_fk_cascade()
     with engine.begin() as conn:
         cnt = conn.scalar(select(func.count()).select_from(agents))
         if cnt == 0:
-            for name in DEFAULT_AGENTS:
-                conn.execute(agents.insert().values(name=name))
-                conn.execute(status.insert().values(agent_name=name, backlog=0, active=0, priority=None))
-                conn.execute(assignment.insert().values(
-                    agent_name=name, easy_to_handle=0, investigation=0, autoclose_tickets=0
-                ))
+            # executemany: un statement por tabla en vez de 3 por agente
+            conn.execute(agents.insert(), [{"name": n} for n in DEFAULT_AGENTS])
+            conn.execute(status.insert(),
+                         [dict(DEFAULT_STATUS_ROW, agent_name=n) for n in DEFAULT_AGENTS])
+            conn.execute(assignment.insert(),
+                         [dict(DEFAULT_ASSIGN_ROW, agent_name=n) for n in DEFAULT_AGENTS])
+        if IS_POSTGRES:
+            conn.execute(text(
+                "CREATE MATERIALIZED VIEW IF NOT EXISTS full_state_mv AS "
+                "SELECT a.name, s.backlog, s.active, coalesce(s.priority, '') AS priority, "
+                "t.easy_to_handle, t.investigation, t.autoclose_tickets "
+                "FROM agents a "
+                "JOIN status s ON s.agent_name = a.name "
+                "JOIN assignment t ON t.agent_name = a.name"
+            ))
+            # Índice único requerido por REFRESH ... CONCURRENTLY
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS full_state_mv_name_idx ON full_state_mv (name)"
+            ))
+            # Índices cobertores: el refresh de la MV lee index-only
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS status_covering ON status (agent_name) "
+                "INCLUDE (backlog, active, priority)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS assignment_covering ON assignment (agent_name) "
+                "INCLUDE (easy_to_handle, investigation, autoclose_tickets)"
+            ))
+
+def refresh_state_mv() -> None:
+    if not IS_POSTGRES:
+        return
+
+    def _refresh() -> None:
+        # CONCURRENTLY no puede correr dentro de una transacción
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY full_state_mv"))
+
+    run_blocking(_refresh)
+
+def _fetch_state_rows():
+    with read_engine.connect() as conn:
+        if IS_POSTGRES:
+            # La MV ya trae el join resuelto: SELECT plano
+            return conn.execute(STATE_MV_SELECT).all()
+        # Un solo SELECT con doble JOIN: las tres tablas son 1:1:1 por nombre
+        return conn.execute(STATE_SELECT).all()
 
 def fetch_state():
-    try:
-        with engine.begin() as conn:
-            st = conn.execute(
-                select(
-                    agents.c.name,
-                    status.c.backlog, status.c.active,
-                    func.coalesce(status.c.priority, "").label("priority")
-                ).join(status, status.c.agent_name == agents.c.name).order_by(agents.c.name)
-            ).mappings().all()
-
-            asg = conn.execute(
-                select(
-                    agents.c.name,
-                    assignment.c.easy_to_handle,
-                    assignment.c.investigation,
-                    assignment.c.autoclose_tickets
-                ).join(assignment, assignment.c.agent_name == agents.c.name).order_by(agents.c.name)
-            ).mappings().all()
-        return {"status": [dict(r) for r in st], "assignment": [dict(r) for r in asg]}
-    except (OperationalError, ProgrammingError):
-        init_db()
-        return fetch_state()
-
-ALLOWED_STATUS_FIELDS = {"backlog", "active", "priority"}
-ALLOWED_ASSIGN_FIELDS = {"easy_to_handle", "investigation", "autoclose_tickets"}
+    # El esquema se garantiza una sola vez en el arranque (init_db); si la DB
+    # falla aquí, el error debe propagarse, no disparar DDL bajo carga.
+    rows = run_blocking(_fetch_state_rows)
+
+    st, asg = [], []
+    for name, backlog, active, priority, easy, inv, auto in rows:
+        st.append({"name": name, "backlog": backlog, "active": active, "priority": priority})
+        asg.append({
+            "name": name, "easy_to_handle": easy,
+            "investigation": inv, "autoclose_tickets": auto
+        })
+    return {"status": st, "assignment": asg}
+
+if orjson is not None:
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    def _json_loads(s):
+        return orjson.loads(s)
+else:
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+    def _json_loads(s):
+        return json.loads(s)
+
+# Caché del estado en memoria: se invalida en cada escritura.
+# Con monkey.patch_all() el Lock es cooperativo con gevent.
+_state_cache = None
+_state_json = None
+_state_lock = threading.Lock()
+
+def get_cached_state():
+    global _state_cache
+    cached = _state_cache
+    if cached is not None:
+        return cached
+    with _state_lock:
+        if _state_cache is None:
+            _state_cache = fetch_state()
+        return _state_cache
+
+def get_cached_state_json() -> str:
+    # Se codifica una sola vez por versión del estado: el payload es
+    # idéntico para todos los clientes que conectan.
+    global _state_json
+    cached = _state_json
+    if cached is None:
+        cached = _json_dumps(get_cached_state())
+        _state_json = cached
+    return cached
+
+def invalidate_state_cache() -> None:
+    global _state_cache, _state_json
+    _state_cache = None
+    _state_json = None
+
 PRIORITY_VALUES = {"", "P1", "P2"}
 
 # ----------------- APP -----------------
+class _OrjsonProvider(JSONProvider):
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+class _JsonModule:
+    # Interfaz tipo módulo json para python-socketio/engineio
+    dumps = staticmethod(lambda obj, **kwargs: _json_dumps(obj))
+    loads = staticmethod(lambda s, **kwargs: _json_loads(s))
+
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret")
+if orjson is not None:
+    app.json = _OrjsonProvider(app)
 
-# Socket.IO con gevent y timeouts estables en Render
+# Socket.IO con gevent y timeouts estables en Render.
+# http_compression: gzip/deflate del payload (el full_state comprime ~5x
+# por los nombres repetidos) en polling; sobre websocket el deflate lo
+# negocia la capa de transporte si el worker lo soporta.
 socketio = SocketIO(
     app, cors_allowed_origins="*",
     async_mode="gevent",
-    ping_timeout=30, ping_interval=25
+    ping_timeout=30, ping_interval=25,
+    json=_JsonModule,
+    http_compression=True, compression_threshold=256
 )
 
 init_db()  # asegura tablas al iniciar
 
 # ----------------- ROUTES -----------------
+@lru_cache(maxsize=2)
+def _today(day: int) -> str:
+    # Formatea una vez por día de epoch; el cliente igual re-pinta su fecha local
+    return datetime.utcfromtimestamp(day * 86400).strftime("%Y-%m-%d")
+
 @app.route("/")
 def index():
-    state = fetch_state()
-    today = datetime.now().strftime("%Y-%m-%d")
+    state = get_cached_state()
+    today = _today(int(time.time()) // 86400)
     return render_template("index.html", state=state, today=today)
 
 @app.route("/health")
@@ -128,12 +407,37 @@ def health():
 # 🔎 Fallback para “near real-time” si el socket no conecta
 @app.get("/state")
 def http_state():
-    return jsonify(fetch_state())
+    return jsonify(get_cached_state())
 
 # ----------------- SOCKET EVENTS -----------------
+# Coalescer de parches: ediciones rápidas de la misma celda se funden y
+# N eventos se despachan en un solo emit por ventana de ~25ms.
+PATCH_FLUSH_DELAY = 0.025
+_pending_patches = {}
+_flush_scheduled = False
+
+def _flush_patches() -> None:
+    global _flush_scheduled
+    socketio.sleep(PATCH_FLUSH_DELAY)
+    _flush_scheduled = False
+    batch = list(_pending_patches.values())
+    _pending_patches.clear()
+    if batch:
+        socketio.emit("cell_updated_batch", batch)
+
+def queue_patch(agent: str, table: str, field: str, value) -> None:
+    global _flush_scheduled
+    _pending_patches[(agent, table, field)] = {
+        "agent": agent, "table": table, "field": field, "value": value
+    }
+    if not _flush_scheduled:
+        _flush_scheduled = True
+        socketio.start_background_task(_flush_patches)
+
 @socketio.on("connect")
 def on_connect():
-    emit("full_state", fetch_state())
+    # String pre-codificado: evita re-serializar el JSON por conexión
+    emit("full_state", get_cached_state_json())
 
 @socketio.on("update_cell")
 def on_update_cell(data):
@@ -144,43 +448,55 @@ def on_update_cell(data):
 
     if not agent:
         emit("error_msg", {"message": "Agent is required."}); return
-    if table not in {"status", "assignment"}:
+    if table not in SEED_STMTS:
         emit("error_msg", {"message": "Invalid table"}); return
-    if table == "status" and field not in ALLOWED_STATUS_FIELDS:
-        emit("error_msg", {"message": "Invalid field"}); return
-    if table == "assignment" and field not in ALLOWED_ASSIGN_FIELDS:
+    # La LUT de statements es a la vez validación y despacho: si el par
+    # (tabla, campo) no está precompilado, el campo no existe.
+    stmt = UPSERT_STMTS.get((table, field))
+    if stmt is None:
         emit("error_msg", {"message": "Invalid field"}); return
 
-    with engine.begin() as conn:
-        # Upsert
-        if not conn.scalar(select(func.count()).select_from(agents).where(agents.c.name == agent)):
-            conn.execute(agents.insert().values(name=agent))
-        if not conn.scalar(select(func.count()).select_from(status).where(status.c.agent_name == agent)):
-            conn.execute(status.insert().values(agent_name=agent, backlog=0, active=0, priority=None))
-        if not conn.scalar(select(func.count()).select_from(assignment).where(assignment.c.agent_name == agent)):
-            conn.execute(assignment.insert().values(
-                agent_name=agent, easy_to_handle=0, investigation=0, autoclose_tickets=0
-            ))
+    if field == "priority":
+        val = (value or "").upper()
+        if val not in PRIORITY_VALUES:
+            val = ""
+        db_value = val or None
+    else:
+        try:
+            db_value = int(value)
+        except Exception:
+            db_value = 0
+        if db_value < 0:
+            db_value = 0
 
-        if field == "priority":
-            val = (value or "").upper()
-            if val not in PRIORITY_VALUES:
-                val = ""
-            conn.execute(status.update().where(status.c.agent_name == agent).values(priority=val or None))
-        else:
-            try:
-                num = int(value)
-            except Exception:
-                num = 0
-            if num < 0: num = 0
-            if table == "status":
-                conn.execute(status.update().where(status.c.agent_name == agent).values({field: num}))
-            else:
-                conn.execute(assignment.update().where(assignment.c.agent_name == agent).values({field: num}))
-
-    socketio.emit("cell_updated",
-                  {"agent": agent, "table": table, "field": field, "value": value},
-                  broadcast=True)
+    # Valor sin cambios (los clientes suelen re-enviar el estado que ya ven):
+    # ni escritura ni broadcast.
+    cached = _state_cache
+    if cached is not None:
+        for row in cached[table]:
+            if row["name"] == agent:
+                current = row[field]
+                if field == "priority":
+                    current = current or None  # el caché guarda "" por el coalesce
+                if current == db_value:
+                    return
+                break
+
+    other = "assignment" if table == "status" else "status"
+
+    def _write() -> None:
+        with engine.begin() as conn:
+            # Upsert atómico: siembra agente/filas y aplica el valor sin checks previos
+            conn.execute(AGENT_SEED_STMT, {"agent": agent})
+            conn.execute(stmt, {"agent": agent, "v": db_value})
+            conn.execute(SEED_STMTS[other], {"agent": agent})
+
+    with WRITE_LOCK:
+        run_blocking(_write)
+
+    refresh_state_mv()
+    invalidate_state_cache()
+    queue_patch(agent, table, field, value)
 
 @socketio.on("rename_agent")
 def on_rename_agent(data):
@@ -191,17 +507,28 @@ def on_rename_agent(data):
     if old == new:
         return
 
-    with engine.begin() as conn:
-        if not conn.scalar(select(func.count()).select_from(agents).where(agents.c.name == old)):
-            emit("error_msg", {"message": "Original agent not found."}); return
-        if conn.scalar(select(func.count()).select_from(agents).where(agents.c.name == new)):
-            emit("error_msg", {"message": "Target name already exists."}); return
+    def _rename():
+        # Devuelve el mensaje de error (o None): emit necesita el contexto
+        # del handler, que no existe dentro del threadpool.
+        with engine.begin() as conn:
+            # Sondas por PK (SELECT ... LIMIT 1) en vez de agregados COUNT(*)
+            if conn.execute(select(agents.c.name).where(agents.c.name == old).limit(1)).first() is None:
+                return "Original agent not found."
+            if conn.execute(select(agents.c.name).where(agents.c.name == new).limit(1)).first() is not None:
+                return "Target name already exists."
+
+            # ON UPDATE CASCADE propaga el rename a status/assignment
+            conn.execute(agents.update().where(agents.c.name == old).values(name=new))
+        return None
 
-        conn.execute(agents.update().where(agents.c.name == old).values(name=new))
-        conn.execute(status.update().where(status.c.agent_name == old).values(agent_name=new))
-        conn.execute(assignment.update().where(assignment.c.agent_name == old).values(agent_name=new))
+    with WRITE_LOCK:
+        error = run_blocking(_rename)
+    if error:
+        emit("error_msg", {"message": error}); return
 
-    socketio.emit("agent_renamed", {"old_name": old, "new_name": new}, broadcast=True)
+    refresh_state_mv()
+    invalidate_state_cache()
+    socketio.emit("agent_renamed", {"old_name": old, "new_name": new})
 
 # --------- Local run ---------
 if __name__ == "__main__":
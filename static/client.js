@@ -118,10 +118,12 @@ socket.on('connect_error', (err) => {
 
 socket.on('full_state', (state) => {
   console.log('[socket] full_state');
+  // El servidor envía el estado pre-serializado como string
+  if (typeof state === 'string') state = JSON.parse(state);
   hydrateFromState(state);
 });
 
-socket.on('cell_updated', (msg) => {
+function applyCellPatch(msg) {
   const { table, agent, field, value } = msg;
   const tableId = table === 'status' ? 'status-table' : 'assignment-table';
   const row = document.querySelector(`#${tableId} tbody tr[data-agent="${agent}"]`);
@@ -135,7 +137,13 @@ socket.on('cell_updated', (msg) => {
     const input = row.querySelector(`input[data-field="${field}"]`);
     if (input) input.value = Math.max(0, parseInt(value, 10) || 0);
   }
+}
+
+// Parches coalescidos por el servidor (y evento individual por compat.)
+socket.on('cell_updated_batch', (batch) => {
+  (batch || []).forEach(applyCellPatch);
 });
+socket.on('cell_updated', applyCellPatch);
 
 socket.on('agent_renamed', ({ old_name, new_name }) => {
   ['status-table', 'assignment-table'].forEach(id => {